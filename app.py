@@ -4,49 +4,140 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from translate import Translator
+from lxml import html
 import requests
+from requests.adapters import HTTPAdapter
 import os
 from datetime import datetime, timedelta
 import logging
+import logging.handlers
+import atexit
 import time
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
 import hashlib
+import sqlite3
 from collections import Counter
 import re
 
+# MyMemory, the default backend of the translate package, rejects queries longer than this many bytes
+MAX_TRANSLATION_QUERY_LENGTH = 500
+
+TRANSLATION_CACHE_TTL = timedelta(days=30)
+
+# MyMemory reports quota and size errors as the translated text instead of raising
+TRANSLATION_QUOTA_PREFIX = "MYMEMORY WARNING"
+TRANSLATION_ERROR_PREFIXES = (TRANSLATION_QUOTA_PREFIX, "QUERY LENGTH LIMIT")
+
+WORD_RE = re.compile(r'\b\w+\b')
+
+ARTICLE_EXTRACTION_SCRIPT = """
+const title = document.querySelector('article h1');
+const content = [...document.querySelectorAll('article p')].map(p => p.textContent).join('\\n');
+const image = document.querySelector('article img');
+return {title: title && title.innerText, content: content, image: image && image.src};
+"""
+
 class ElPaisArticleAnalyzer:
-    def __init__(self, base_url="https://elpais.com"):
+    def __init__(self, base_url="https://elpais.com", num_workers=5, debugger_address=None):
         """Initialize the analyzer with WebDriver and Translator"""
         self.base_url = base_url
-        self.translator = Translator(to_lang="en", from_lang="es")
+        self.num_workers = num_workers
+        self.debugger_address = debugger_address
+        self.target_lang = "en"
+        self.translator = Translator(to_lang=self.target_lang, from_lang="es")
         self.setup_logging()
+        self.setup_translation_cache()
         self.setup_driver()
         self.setup_directories()
+        self.setup_http_session()
 
     def setup_logging(self):
         """Set up logging configuration"""
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler('elpais_scraper.log', delay=True)
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+
+        # Write log records from a background thread so scraping threads never block on I/O
+        log_queue = queue.Queue(-1)
+        self.log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+        self.log_listener.start()
+        atexit.register(self.log_listener.stop)
+
         logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('elpais_scraper.log'),
-                logging.StreamHandler()
-            ]
+            format='%(message)s',
+            handlers=[logging.handlers.QueueHandler(log_queue)]
         )
         self.logger = logging.getLogger(__name__)
 
-    def setup_driver(self):
-        """Configure and initialize Chrome WebDriver"""
+    def setup_translation_cache(self, cache_path="translation_cache.sqlite"):
+        """Open the on-disk translation cache and evict expired entries"""
+        self.translation_cache = sqlite3.connect(cache_path)
+        self.translation_cache.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "hash TEXT, lang TEXT, translated TEXT, ts INTEGER, PRIMARY KEY (hash, lang))"
+        )
+        expired_before = int((datetime.now() - TRANSLATION_CACHE_TTL).timestamp())
+        self.translation_cache.execute("DELETE FROM translations WHERE ts < ?", (expired_before,))
+        self.translation_cache.commit()
+        self.translation_quota_exhausted = False
+
+    def get_cached_translation(self, title):
+        """Return the cached translation of a title, or None on a miss"""
+        title_hash = hashlib.md5(title.encode('utf-8')).hexdigest()
+        expired_before = int((datetime.now() - TRANSLATION_CACHE_TTL).timestamp())
+        row = self.translation_cache.execute(
+            "SELECT translated FROM translations WHERE hash = ? AND lang = ? AND ts >= ?",
+            (title_hash, self.target_lang, expired_before)
+        ).fetchone()
+        return row[0] if row else None
+
+    def cache_translation(self, title, translated_title):
+        """Store a title translation in the on-disk cache"""
+        title_hash = hashlib.md5(title.encode('utf-8')).hexdigest()
+        self.translation_cache.execute(
+            "INSERT OR REPLACE INTO translations (hash, lang, translated, ts) VALUES (?, ?, ?, ?)",
+            (title_hash, self.target_lang, translated_title, int(time.time()))
+        )
+        self.translation_cache.commit()
+
+    def create_driver(self):
+        """Configure and create a headless Chrome WebDriver instance"""
         options = webdriver.ChromeOptions()
-        options.add_argument('--start-maximized')
+        # Return from driver.get once the DOM is ready; callers wait for the elements they need
+        options.page_load_strategy = 'eager'
+        options.add_argument('--headless=new')
+        options.add_argument('--disable-gpu')
         options.add_argument('--lang=es')
         options.add_argument('--accept-lang=es')
-        
+        # Only the img src attribute is read, so skip downloading images
+        options.add_argument('--blink-settings=imagesEnabled=false')
         options.add_experimental_option('prefs', {
-            'intl.accept_languages': 'es,es_ES'
+            'intl.accept_languages': 'es,es_ES',
+            'profile.managed_default_content_settings.images': 2
         })
         
-        self.driver = webdriver.Chrome(options=options)
+        return webdriver.Chrome(options=options)
+
+    def attach_driver(self, debugger_address):
+        """Attach a WebDriver to an already running Chrome started with --remote-debugging-port"""
+        options = webdriver.ChromeOptions()
+        options.page_load_strategy = 'eager'
+        options.add_experimental_option('debuggerAddress', debugger_address)
+        return webdriver.Chrome(options=options)
+
+    def setup_driver(self):
+        """Initialize the main Chrome WebDriver used for navigation"""
+        if self.debugger_address:
+            # A long-lived browser keeps its profile, so cookie consent survives between runs
+            self.driver = self.attach_driver(self.debugger_address)
+            self.logger.info(f"Attached to Chrome at {self.debugger_address}")
+        else:
+            self.driver = self.create_driver()
         self.wait = WebDriverWait(self.driver, 10)
 
     def setup_directories(self):
@@ -59,25 +150,52 @@ class ElPaisArticleAnalyzer:
             os.makedirs(self.image_dir)
             self.logger.info(f"Created image directory: {self.image_dir}")
 
+    def setup_http_session(self):
+        """Create a pooled HTTP session for fetching article pages"""
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def handle_image_url(self, image_url):
+        """Log the image found for an article"""
+        if image_url:
+            self.logger.info(f"Found image URL: {image_url}")
+        else:
+            self.logger.warning("No image found")
+
     def navigate_to_opinion_section(self):
         """Navigate to the Opinion section of El País"""
         try:
             self.driver.get(self.base_url)
-            time.sleep(2)
 
-            try:
-                cookie_button = self.wait.until(
-                    EC.element_to_be_clickable((By.ID, "didomi-notice-agree-button"))
-                )
-                cookie_button.click()
-                self.logger.info("Accepted cookies")
-                time.sleep(1)
-            except TimeoutException:
-                self.logger.info("No cookie consent needed")
+            # An attached browser keeps its profile, so consent may already be stored
+            if self.debugger_address and self.driver.get_cookie('didomi_token'):
+                self.logger.info("Cookie consent already stored")
+            else:
+                try:
+                    cookie_button = self.wait.until(
+                        EC.element_to_be_clickable((By.ID, "didomi-notice-agree-button"))
+                    )
+                    cookie_button.click()
+                    self.logger.info("Accepted cookies")
+                except TimeoutException:
+                    self.logger.info("No cookie consent needed")
+                else:
+                    try:
+                        self.wait.until(
+                            EC.invisibility_of_element_located((By.ID, "didomi-notice-agree-button"))
+                        )
+                    except TimeoutException:
+                        self.logger.warning("Cookie consent notice is still visible after accepting")
 
             opinion_url = urljoin(self.base_url, "/opinion")
             self.driver.get(opinion_url)
-            time.sleep(2)
+            self.wait.until(
+                EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, "article a[href*='/opinion/']")
+                )
+            )
             self.logger.info("Navigated to Opinion section")
 
         except Exception as e:
@@ -92,7 +210,7 @@ class ElPaisArticleAnalyzer:
             yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
 
             # Define allowed date patterns
-            allowed_dates = [f"/opinion/{today}/", f"/opinion/{yesterday}/"]
+            allowed_dates = (f"/opinion/{today}/", f"/opinion/{yesterday}/")
 
             # Find all potential article links
             articles = self.wait.until(
@@ -106,7 +224,7 @@ class ElPaisArticleAnalyzer:
             
             for article in articles:
                 href = article.get_attribute('href')
-                if href and href not in seen_links and any(date in href for date in allowed_dates):
+                if href and href not in seen_links and urlsplit(href).path.startswith(allowed_dates):
                     seen_links.add(href)
                     article_links.append(href)
                     if len(article_links) >= max_links:
@@ -119,68 +237,147 @@ class ElPaisArticleAnalyzer:
             self.logger.error(f"Error getting article links: {str(e)}")
             return []
 
+    def is_translation_error(self, translated_text):
+        """Check whether the translator returned an error message instead of a translation"""
+        return translated_text.strip().upper().startswith(TRANSLATION_ERROR_PREFIXES)
+
+    def check_translation_quota(self, translated_text):
+        """Remember when MyMemory reports that the daily quota is used up"""
+        if translated_text.strip().upper().startswith(TRANSLATION_QUOTA_PREFIX):
+            self.logger.error(f"Translation quota exhausted: {translated_text}")
+            self.translation_quota_exhausted = True
+
     def translate_title(self, title):
         """Translate article title to English"""
+        cached_title = self.get_cached_translation(title)
+        if cached_title is not None:
+            return cached_title
+        if self.translation_quota_exhausted:
+            return title
+
         try:
             translated_title = self.translator.translate(title)
+            self.check_translation_quota(translated_title)
+            if self.is_translation_error(translated_title):
+                self.logger.error(f"Translation error: {translated_title}")
+                return title
+            self.cache_translation(title, translated_title)
             return translated_title
         except Exception as e:
             self.logger.error(f"Translation error: {str(e)}")
             return title
 
-    def scrape_article(self, url, article_number):
-        """Scrape content from a single article"""
+    def translate_titles(self, titles):
+        """Translate article titles to English, batching them into as few requests as possible"""
+        translations = {}
+        for title in titles:
+            cached_title = self.get_cached_translation(title)
+            if cached_title is not None:
+                translations[title] = cached_title
+
+        batches = []
+        for title in dict.fromkeys(titles):
+            if title in translations:
+                continue
+            if batches and len("\n".join(batches[-1] + [title]).encode('utf-8')) <= MAX_TRANSLATION_QUERY_LENGTH:
+                batches[-1].append(title)
+            else:
+                batches.append([title])
+
+        for batch in batches:
+            # Once the quota is gone every further request is certain to fail
+            if self.translation_quota_exhausted:
+                translations.update((title, title) for title in batch)
+                continue
+
+            try:
+                translated_text = self.translator.translate("\n".join(batch))
+                self.check_translation_quota(translated_text)
+                translated_batch = translated_text.split("\n")
+            except Exception as e:
+                self.logger.error(f"Batch translation error: {str(e)}")
+                translated_batch = []
+
+            if any(self.is_translation_error(t) for t in translated_batch):
+                self.logger.error(f"Batch translation error: {' '.join(translated_batch)}")
+                translated_batch = []
+
+            if len(translated_batch) == len(batch):
+                for title, translated_title in zip(batch, translated_batch):
+                    translations[title] = translated_title.strip()
+                    self.cache_translation(title, translations[title])
+            elif len(batch) > 1 and not self.translation_quota_exhausted:
+                self.logger.warning("Batch translation failed, translating titles one by one")
+                for title in batch:
+                    translations[title] = self.translate_title(title)
+            else:
+                # A single title would resend the identical query, and a spent quota fails every retry
+                translations.update((title, title) for title in batch)
+
+        return [translations[title] for title in titles]
+
+    def scrape_article_fast(self, url):
+        """Scrape a server-rendered article over plain HTTP, returning None if a browser is needed"""
         try:
-            print(f"Scraping article {article_number}: {url}")
-            self.driver.get(url)
-            time.sleep(2)
+            response = self.session.get(url, headers={'Accept-Language': 'es'}, timeout=10)
+            if response.status_code != 200:
+                return None
 
-            if "/opinion/editoriales/" in url or "/opinion/tribunas/" in url:
-                self.logger.warning(f"Skipping folder-like article URL: {url}")
+            doc = html.fromstring(response.content)
+            title = doc.xpath('string(//article//h1)').strip()
+            content = [p.text_content() for p in doc.xpath('//article//p')]
+            if not title or not content:
                 return None
+            self.logger.info(f"Found title: {title}")
+
+            image_urls = doc.xpath('//article//img/@src')
+            self.handle_image_url(urljoin(url, image_urls[0]) if image_urls else None)
+
+            return {
+                'title': title,
+                'content': "\n".join(content),
+                'url': url
+            }
+
+        except Exception as e:
+            self.logger.warning(f"Could not fetch article {url} without a browser: {str(e)}")
+            return None
+
+    def scrape_article(self, driver, url):
+        """Scrape content from a single article using the given WebDriver"""
+        wait = WebDriverWait(driver, 10)
+        try:
+            driver.get(url)
 
             try:
-                title_element = self.wait.until(
+                wait.until(
                     EC.presence_of_element_located(
                         (By.CSS_SELECTOR, "article h1")
                     )
                 )
-                title = title_element.text.strip()
-                if not title:
-                    self.logger.warning("Article has no valid title. Skipping.")
-                    return None
-
-                self.logger.info(f"Found title: {title}")
             except TimeoutException:
                 self.logger.error("Could not find article title")
                 return None
 
-            try:
-                paragraphs = self.wait.until(
-                    EC.presence_of_all_elements_located(
-                        (By.CSS_SELECTOR, "article p")
-                    )
-                )
-                content = [p.text for p in paragraphs]
-            except TimeoutException:
+            # Read title, paragraphs and image in one browser round-trip
+            data = driver.execute_script(ARTICLE_EXTRACTION_SCRIPT)
+
+            title = (data['title'] or '').strip()
+            if not title:
+                self.logger.warning("Article has no valid title. Skipping.")
+                return None
+            self.logger.info(f"Found title: {title}")
+
+            content = data['content']
+            if not content:
                 self.logger.error("Could not find article content")
                 return None
 
-            try:
-                image_element = self.wait.until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, "article img")
-                    )
-                )
-                image_url = image_element.get_attribute('src')
-                self.logger.info(f"Found image URL: {image_url}")
-            except TimeoutException:
-                image_url = None
-                self.logger.warning("No image found")
+            self.handle_image_url(data['image'])
 
             return {
                 'title': title,
-                'content': "\n".join(content),
+                'content': content,
                 'url': url
             }
 
@@ -188,42 +385,78 @@ class ElPaisArticleAnalyzer:
             self.logger.error(f"Error scraping article {url}: {str(e)}")
             return None
 
+    def scrape_article_from_pool(self, driver_pool, url, article_number):
+        """Scrape a single article, borrowing a WebDriver from the pool only if plain HTTP is not enough"""
+        self.logger.info(f"Processing article {article_number}: {url}")
+        if "/opinion/editoriales/" in url or "/opinion/tribunas/" in url:
+            self.logger.warning(f"Skipping folder-like article URL: {url}")
+            return None
+
+        print(f"Scraping article {article_number}: {url}")
+        article = self.scrape_article_fast(url)
+        if article:
+            return article
+
+        # Browsers are only started once some article actually needs one
+        self.logger.info(f"Falling back to the browser for article {article_number}")
+        try:
+            driver = driver_pool.get_nowait()
+        except queue.Empty:
+            try:
+                driver = self.create_driver()
+            except Exception as e:
+                self.logger.error(f"Could not start a browser for article {url}: {str(e)}")
+                return None
+        try:
+            return self.scrape_article(driver, url)
+        finally:
+            driver_pool.put(driver)
+
     def process_articles(self, num_articles=5):
         """Main method to process articles"""
+        driver_pool = None
         try:
             self.navigate_to_opinion_section()
             article_links = self.get_article_links(max_links=10)
-            
-            articles = []
-            for i, url in enumerate(article_links, 1):
-                self.logger.info(f"Processing article {i} of {len(article_links)}")
-                article = self.scrape_article(url, i)
-                if article:
-                    articles.append(article)
-                if len(articles) >= num_articles:
-                    break
+            if not article_links:
+                return []
+
+            driver_pool = queue.Queue()
 
-            return articles
+            scraped = []
+            with ThreadPoolExecutor(max_workers=min(self.num_workers, len(article_links))) as executor:
+                article_futures = {
+                    executor.submit(self.scrape_article_from_pool, driver_pool, url, i): i
+                    for i, url in enumerate(article_links, 1)
+                }
+                for future in as_completed(article_futures):
+                    article = future.result()
+                    if article:
+                        scraped.append((article_futures[future], article))
+                    if len(scraped) >= num_articles:
+                        for pending in article_futures:
+                            pending.cancel()
+                        break
+
+            # Keep the order in which articles appear on the Opinion page
+            return [article for _, article in sorted(scraped, key=lambda item: item[0])]
 
         finally:
+            self.session.close()
             self.driver.quit()
+            if driver_pool is not None:
+                while not driver_pool.empty():
+                    driver_pool.get_nowait().quit()
 
     def analyze_translated_headers(self, articles):
         """Translate and analyze article headers"""
-        translated_titles = []
-        for article in articles:
-            translated_title = self.translate_title(article['title'])
-            translated_titles.append(translated_title)
+        translated_titles = self.translate_titles([article['title'] for article in articles])
+        for article, translated_title in zip(articles, translated_titles):
             print(f"Original Title: {article['title']}\nTranslated Title: {translated_title}\n")
 
-        # Flatten and normalize words for analysis
-        all_words = []
-        for title in translated_titles:
-            words = re.findall(r'\b\w+\b', title.lower())
-            all_words.extend(words)
-
-        # Count occurrences of each word
-        word_counts = Counter(all_words)
+        # Normalize all titles and count occurrences of each word in one pass
+        joined_titles = "\n".join(title.lower() for title in translated_titles)
+        word_counts = Counter(WORD_RE.findall(joined_titles))
         repeated_words = {word: count for word, count in word_counts.items() if count > 2}
 
         print("\nRepeated Words Analysis:")
@@ -231,8 +464,9 @@ class ElPaisArticleAnalyzer:
             print(f"{word}: {count}")
 
 def main():
+    analyzer = None
     try:
-        analyzer = ElPaisArticleAnalyzer()
+        analyzer = ElPaisArticleAnalyzer(debugger_address=os.environ.get("CHROME_DEBUGGER_ADDRESS"))
         articles = analyzer.process_articles()
         if articles:
             analyzer.analyze_translated_headers(articles)
@@ -240,6 +474,9 @@ def main():
             print("No articles to analyze.")
     except Exception as e:
         print(f"Error in main execution: {str(e)}")
+    finally:
+        if analyzer is not None:
+            analyzer.translation_cache.close()
 
 if __name__ == "__main__":
     main()